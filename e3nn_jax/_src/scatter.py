@@ -33,6 +33,7 @@ def scatter_sum(
     output_size: Optional[int] = None,
     map_back: bool = False,
     mode: str = "promise_in_bounds",
+    indices_are_sorted: bool = False,
 ) -> Union[jnp.ndarray, e3nn.IrrepsArray]:
     r"""Scatter sum of data.
 
@@ -50,6 +51,7 @@ def scatter_sum(
         output_size (optional, int): size of output array.
             If not specified, ``nel`` must be specified or ``map_back`` must be ``True``.
         map_back (bool): whether to map back to the input position
+        indices_are_sorted (bool): whether ``dst`` is known to be sorted, enables a faster scatter
 
     Returns:
         `jax.numpy.ndarray` or `IrrepsArray`: output array of shape ``(output_size, ...)``
@@ -63,6 +65,7 @@ def scatter_sum(
         output_size=output_size,
         map_back=map_back,
         mode=mode,
+        indices_are_sorted=indices_are_sorted,
     )
 
 
@@ -74,6 +77,7 @@ def scatter_mean(
     output_size: Optional[int] = None,
     map_back: bool = False,
     mode: str = "promise_in_bounds",
+    indices_are_sorted: bool = False,
 ) -> Union[jnp.ndarray, e3nn.IrrepsArray]:
     r"""Scatter mean of data.
 
@@ -93,6 +97,7 @@ def scatter_mean(
         output_size (optional, int): size of output array.
             If not specified, ``nel`` must be specified or ``map_back`` must be ``True``.
         map_back (bool): whether to map back to the input position
+        indices_are_sorted (bool): whether ``dst`` is known to be sorted, enables a faster scatter
 
     Returns:
         `jax.numpy.ndarray` or `IrrepsArray`: output array of shape ``(output_size, ...)``
@@ -130,6 +135,7 @@ def scatter_mean(
         output_size=output_size,
         map_back=map_back,
         mode=mode,
+        indices_are_sorted=indices_are_sorted,
     )
 
     if dst is not None or map_back:
@@ -147,6 +153,7 @@ def scatter_mean(
             output_size=output_size,
             map_back=map_back,
             mode=mode,
+            indices_are_sorted=indices_are_sorted,
         )
 
     nel = jnp.maximum(1, nel)
@@ -166,6 +173,7 @@ def scatter_max(
     output_size: Optional[int] = None,
     map_back: bool = False,
     mode: str = "promise_in_bounds",
+    indices_are_sorted: bool = False,
 ) -> Union[jnp.ndarray, e3nn.IrrepsArray]:
     r"""Scatter max of data.
 
@@ -185,6 +193,7 @@ def scatter_max(
         output_size (optional, int): size of output array. If not specified, ``nel`` must be specified
             or ``map_back`` must be ``True``.
         map_back (bool): whether to map back to the input position
+        indices_are_sorted (bool): whether ``dst`` is known to be sorted, enables a faster scatter
 
     Returns:
         `jax.numpy.ndarray` or `IrrepsArray`: output array of shape ``(output_size, ...)``
@@ -202,6 +211,7 @@ def scatter_max(
         output_size=output_size,
         map_back=map_back,
         mode=mode,
+        indices_are_sorted=indices_are_sorted,
     )
 
 
@@ -215,6 +225,7 @@ def _scatter_op(
     output_size: Optional[int] = None,
     map_back: bool = False,
     mode: str = "promise_in_bounds",
+    indices_are_sorted: bool = False,
 ) -> Union[jnp.ndarray, e3nn.IrrepsArray]:
     if dst is None and nel is None:
         raise ValueError("Either dst or nel must be specified")
@@ -230,8 +241,6 @@ def _scatter_op(
         indices_are_sorted = True
         if map_back:
             output_size = None
-    else:
-        indices_are_sorted = False
 
     if not (dst.shape == data.shape[: dst.ndim]):
         raise ValueError(
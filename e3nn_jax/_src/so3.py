@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import numpy as np
 
 from e3nn_jax._src.su2 import su2_clebsch_gordan, su2_generators
@@ -18,6 +20,7 @@ def change_basis_real_to_complex(l: int) -> np.ndarray:
     return (-1j) ** l * q
 
 
+@lru_cache(maxsize=None)
 def clebsch_gordan(l1: int, l2: int, l3: int) -> np.ndarray:
     r"""The Clebsch-Gordan coefficients of the real irreducible representations of :math:`SO(3)`.
 
@@ -27,7 +30,7 @@ def clebsch_gordan(l1: int, l2: int, l3: int) -> np.ndarray:
         l3 (int): the representation order of the third irrep
 
     Returns:
-        np.ndarray: the Clebsch-Gordan coefficients
+        np.ndarray: the Clebsch-Gordan coefficients (read-only, the result is cached)
     """
     C = su2_clebsch_gordan(l1, l2, l3)
     Q1 = change_basis_real_to_complex(l1)
@@ -36,7 +39,9 @@ def clebsch_gordan(l1: int, l2: int, l3: int) -> np.ndarray:
     C = np.einsum("ij,kl,mn,ikn->jlm", Q1, Q2, np.conj(Q3.T), C)
 
     assert np.all(np.abs(np.imag(C)) < 1e-5)
-    return np.real(C)
+    C = np.real(C)
+    C.setflags(write=False)
+    return C
 
 
 def generators(l: int) -> np.ndarray:
@@ -224,9 +224,9 @@ def _jvp(
     def h(l: int, r: jnp.ndarray) -> jnp.ndarray:
         w = e3nn.clebsch_gordan(l - 1, l, 1)
         if normalization == "norm":
-            w *= ((2 * l + 1) * l * (2 * l - 1)) ** 0.5
+            w = w * ((2 * l + 1) * l * (2 * l - 1)) ** 0.5
         else:
-            w *= l**0.5 * (2 * l + 1)
+            w = w * l**0.5 * (2 * l + 1)
         w = w.astype(x.dtype)
 
         if "dense" in algorithm:
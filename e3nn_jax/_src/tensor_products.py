@@ -1,5 +1,6 @@
 import itertools
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
 import jax.numpy as jnp
 import numpy as np
@@ -33,10 +34,15 @@ def _validate_filter_ir_out(filter_ir_out):
             filter_ir_out = e3nn.Irreps(filter_ir_out)
         if isinstance(filter_ir_out, e3nn.Irrep):
             filter_ir_out = [filter_ir_out]
-        filter_ir_out = [e3nn.Irrep(ir) for ir in filter_ir_out]
+        filter_ir_out = frozenset(e3nn.Irrep(ir) for ir in filter_ir_out)
     return filter_ir_out
 
 
+@lru_cache(maxsize=None)
+def _selection_rule(ir_1: e3nn.Irrep, ir_2: e3nn.Irrep) -> Tuple[e3nn.Irrep, ...]:
+    return tuple(ir_1 * ir_2)
+
+
 @overload_for_irreps_without_array((0, 1))
 def tensor_product(
     input1: e3nn.IrrepsArray,
@@ -98,7 +104,7 @@ def tensor_product(
     chunks = []
     for (mul_1, ir_1), x1 in zip(input1.irreps, input1.chunks):
         for (mul_2, ir_2), x2 in zip(input2.irreps, input2.chunks):
-            for ir_out in ir_1 * ir_2:
+            for ir_out in _selection_rule(ir_1, ir_2):
                 if filter_ir_out is not None and ir_out not in filter_ir_out:
                     continue
 
@@ -183,7 +189,7 @@ def elementwise_tensor_product(
     for (mul, ir_1), x1, (_, ir_2), x2 in zip(
         input1.irreps, input1.chunks, input2.irreps, input2.chunks
     ):
-        for ir_out in ir_1 * ir_2:
+        for ir_out in _selection_rule(ir_1, ir_2):
             if filter_ir_out is not None and ir_out not in filter_ir_out:
                 continue
 
@@ -259,7 +265,7 @@ def tensor_square(
 
     for i_1, ((mul_1, ir_1), x1) in enumerate(zip(input.irreps, input.chunks)):
         for i_2, ((mul_2, ir_2), x2) in enumerate(zip(input.irreps, input.chunks)):
-            for ir_out in ir_1 * ir_2:
+            for ir_out in _selection_rule(ir_1, ir_2):
                 if normalized_input:
                     if irrep_normalization == "component":
                         alpha = ir_1.dim * ir_2.dim * ir_out.dim
@@ -1,14 +1,132 @@
-from typing import Callable, List
+from functools import lru_cache
+from typing import Callable, List, Optional
 
 import haiku as hk
 import jax
 import jax.numpy as jnp
+import numpy as np
 
 import e3nn_jax as e3nn
 
 
-def _index_max(i: jnp.ndarray, x: jnp.ndarray, out_dim: int) -> jnp.ndarray:
-    return jnp.zeros((out_dim,) + x.shape[1:], x.dtype).at[i].max(x)
+@lru_cache(maxsize=None)
+def _head_index(irreps: e3nn.Irreps, num_heads: int) -> np.ndarray:
+    """Head of each component of ``irreps``, the multiplicities are split in ``num_heads`` contiguous blocks."""
+    if not all(mul % num_heads == 0 for mul, _ in irreps):
+        raise ValueError(
+            f"num_heads={num_heads} does not divide all multiplicities: {irreps}"
+        )
+    head = np.concatenate(
+        [np.zeros((0,), np.int32)]
+        + [
+            np.repeat(np.arange(num_heads, dtype=np.int32), mul // num_heads * ir.dim)
+            for mul, ir in irreps
+        ]
+    )
+    head.setflags(write=False)
+    return head
+
+
+@lru_cache(maxsize=None)
+def _mul_index(irreps: e3nn.Irreps) -> np.ndarray:
+    """Index of the irrep (counting the multiplicities) of each component of ``irreps``."""
+    index = np.repeat(
+        np.arange(irreps.num_irreps, dtype=np.int32),
+        [ir.dim for mul, ir in irreps for _ in range(mul)],
+    )
+    index.setflags(write=False)
+    return index
+
+
+@lru_cache(maxsize=None)
+def _dot_scale(irreps: e3nn.Irreps) -> np.ndarray:
+    """Scale of each component such that the sum of the products of two arrays of ``irreps`` is normalized."""
+    scale = np.concatenate(
+        [np.zeros((0,), np.float32)]
+        + [np.full((mul * ir.dim,), ir.dim**-0.5, np.float32) for mul, ir in irreps]
+    ) / np.sqrt(max(irreps.num_irreps, 1))
+    scale.setflags(write=False)
+    return scale
+
+
+def _sqrt_segment_softmax(
+    logits: jnp.ndarray,  # [E, H]
+    weights: jnp.ndarray,  # [E]
+    segments: jnp.ndarray,  # [E]
+    num_segments: int,
+    indices_are_sorted: bool = False,
+) -> jnp.ndarray:
+    """Square root of the softmax of the logits over each segment, the terms of the sum are scaled by the weights."""
+    # Edges with zero weight do not contribute, their logits must not set the shift nor overflow
+    positive = weights > 0.0
+    logits = jnp.where(positive[:, None], logits, jnp.finfo(logits.dtype).min)
+    # The softmax is invariant to the shift, it only keeps the exponentials in range
+    logits_max = e3nn.scatter_max(
+        jax.lax.stop_gradient(logits),
+        dst=segments,
+        initial=jnp.finfo(logits.dtype).min,
+        output_size=num_segments,
+        indices_are_sorted=indices_are_sorted,
+    )  # [N, H]
+    logits_max = logits_max.at[segments].get(
+        indices_are_sorted=indices_are_sorted
+    )  # [E, H]
+    # sqrt(w exp(x) / z) = sqrt(w) exp(x / 2) / sqrt(z)
+    half_exp = jnp.exp(0.5 * (logits - logits_max))  # [E, H]
+    z = e3nn.scatter_sum(
+        weights[:, None] * half_exp**2,
+        dst=segments,
+        output_size=num_segments,
+        indices_are_sorted=indices_are_sorted,
+    )  # [N, H]
+    # Segments with all weights zero have z = 0, their outputs stay 0
+    z = jnp.where(z == 0.0, 1.0, z)
+    z_rsqrt = (
+        jax.lax.rsqrt(z).at[segments].get(indices_are_sorted=indices_are_sorted)
+    )  # [E, H]
+    # sqrt has an infinite derivative at 0, it is only evaluated on the positive weights
+    sqrt_weights = jnp.where(positive, jnp.sqrt(jnp.where(positive, weights, 1.0)), 0.0)
+    return sqrt_weights[:, None] * half_exp * z_rsqrt  # [E, H]
+
+
+def _tensor_product_mlp(
+    x: e3nn.IrrepsArray,
+    y: e3nn.IrrepsArray,
+    list_filter_ir_out: List[e3nn.Irreps],
+    list_neurons: List[int],
+    act: Callable[[jnp.ndarray], jnp.ndarray],
+    name: str,
+) -> List[e3nn.IrrepsArray]:
+    filter_ir_out = [ir for irreps in list_filter_ir_out for _, ir in irreps]
+    out1 = e3nn.concatenate(
+        [
+            x,
+            e3nn.tensor_product(x, y.filter(drop="0e"), filter_ir_out=filter_ir_out),
+        ]
+    ).regroup()
+    out1 = [out1.filter(keep=irreps) for irreps in list_filter_ir_out]
+    num_chunks = [len(out.irreps) for out in out1]
+    out1 = e3nn.concatenate(out1)
+
+    # A single MLP computes the weights of all the outputs
+    out2 = e3nn.haiku.MultiLayerPerceptron(
+        list_neurons + [out1.irreps.num_irreps],
+        act,
+        output_activation=False,
+        name=name,
+    )(y.filter(keep="0e"))
+
+    # Scale all the irreps at once in the contiguous array
+    out = e3nn.IrrepsArray(
+        out1.irreps, out1.array * out2.array[..., _mul_index(out1.irreps)]
+    )
+
+    outputs = []
+    i = 0
+    for n in num_chunks:
+        outputs.append(out.slice_by_chunk[i : i + n])
+        i += n
+    return outputs
 
 
 class Transformer(hk.Module):
@@ -18,6 +136,7 @@ class Transformer(hk.Module):
         list_neurons: List[int],
         act: Callable[[jnp.ndarray], jnp.ndarray],
         num_heads: int = 1,
+        logit_dtype: Optional[jnp.dtype] = None,
     ):
         super().__init__()
 
@@ -25,6 +144,7 @@ class Transformer(hk.Module):
         self.list_neurons = list_neurons
         self.act = act
         self.num_heads = num_heads
+        self.logit_dtype = logit_dtype
 
     def __call__(
         self,
@@ -33,6 +153,7 @@ class Transformer(hk.Module):
         edge_weight_cutoff: jnp.ndarray,  # [E] dtype=float
         edge_attr: e3nn.IrrepsArray,  # [E, D] dtype=float
         node_feat: e3nn.IrrepsArray,  # [N, D] dtype=float
+        sorted_dst: bool = False,
     ) -> e3nn.IrrepsArray:
         r"""Equivariant Transformer.
 
@@ -42,48 +163,55 @@ class Transformer(hk.Module):
             edge_weight_cutoff (array of float): cutoff weight for the edges (typically given by ``soft_envelope``)
             edge_attr (e3nn.IrrepsArray): attributes of the edges (typically given by ``spherical_harmonics``)
             node_f (e3nn.IrrepsArray): features of the nodes
+            sorted_dst (bool): whether ``edge_dst`` is sorted, enables faster scatter and gather operations
 
         Returns:
             e3nn.IrrepsArray: output features of the nodes
         """
+        edge_key, edge_v = _tensor_product_mlp(
+            node_feat[edge_src],
+            edge_attr,
+            [node_feat.irreps, self.irreps_node_output],
+            self.list_neurons,
+            self.act,
+            name="mlp",
+        )  # [E, D], [E, D]
 
-        def f(x, y, filter_ir_out=None, name=None):
-            out1 = (
-                e3nn.concatenate([x, e3nn.tensor_product(x, y.filter(drop="0e"))])
-                .regroup()
-                .filter(keep=filter_ir_out)
-            )
-            out2 = e3nn.haiku.MultiLayerPerceptron(
-                self.list_neurons + [out1.irreps.num_irreps],
-                self.act,
-                output_activation=False,
-                name=name,
-            )(y.filter(keep="0e"))
-            return out1 * out2
-
-        edge_key = f(node_feat[edge_src], edge_attr, node_feat.irreps, name="mlp_key")
-        edge_logit = e3nn.haiku.Linear(f"{self.num_heads}x0e", name="linear_logit")(
-            e3nn.tensor_product(node_feat[edge_dst], edge_key, filter_ir_out="0e")
-        ).array  # [E, H]
-        node_logit_max = _index_max(edge_dst, edge_logit, node_feat.shape[0])  # [N, H]
-        exp = edge_weight_cutoff[:, None] * jnp.exp(
-            edge_logit - node_logit_max[edge_dst]
+        # The logits are the dot products of a query of the destination with the key,
+        # the query is computed on the nodes and holds one copy of the key irreps per head
+        irreps_query = edge_key.irreps.repeat(self.num_heads)
+        query = e3nn.haiku.Linear(irreps_query, name="linear_query")(node_feat)
+
+        # The softmax is tolerant to a reduced precision of the logits
+        logit_dtype = self.logit_dtype or node_feat.dtype
+        query = (
+            query.array.astype(logit_dtype)
+            .at[edge_dst]
+            .get(indices_are_sorted=sorted_dst)
+        )  # [E, H * D]
+        query = query.reshape(
+            query.shape[:-1] + (self.num_heads, edge_key.irreps.dim)
+        )  # [E, H, D]
+        key = (edge_key.array * _dot_scale(edge_key.irreps)).astype(logit_dtype)
+        # Only the operands are in reduced precision, the sum is accumulated in full precision
+        edge_logit = jnp.einsum(
+            "ehd,ed->eh", query, key, preferred_element_type=node_feat.dtype
+        )  # [E, H]
+        sqrt_alpha = _sqrt_segment_softmax(
+            edge_logit, edge_weight_cutoff, edge_dst, node_feat.shape[0], sorted_dst
         )  # [E, H]
-        z = e3nn.scatter_sum(
-            exp, dst=edge_dst, output_size=node_feat.shape[0]
-        )  # [N, H]
-        z = jnp.where(z == 0.0, 1.0, z)
-        alpha = exp / z[edge_dst]  # [E, H]
-
-        edge_v = f(
-            node_feat[edge_src], edge_attr, self.irreps_node_output, "mlp_val"
+
+        # Scale all the components of each head at once in the contiguous array
+        head = _head_index(edge_v.irreps, self.num_heads)  # [D]
+        edge_v = e3nn.IrrepsArray(
+            edge_v.irreps, edge_v.array * sqrt_alpha[:, head]
         )  # [E, D]
-        edge_v = edge_v.mul_to_axis(self.num_heads)  # [E, H, D]
-        edge_v = edge_v * jnp.sqrt(jax.nn.relu(alpha))[:, :, None]  # [E, H, D]
-        edge_v = edge_v.axis_to_mul()  # [E, D]
 
         node_out = e3nn.scatter_sum(
-            edge_v, dst=edge_dst, output_size=node_feat.shape[0]
+            edge_v,
+            dst=edge_dst,
+            output_size=node_feat.shape[0],
+            indices_are_sorted=sorted_dst,
         )  # [N, D]
         return e3nn.haiku.Linear(self.irreps_node_output, name="linear_out")(
             node_out
@@ -1,4 +1,5 @@
 import time
+from functools import partial
 
 import flax
 import jax
@@ -22,12 +23,13 @@ def tetris() -> jraph.GraphsTuple:
         [[0, 0, 0], [1, 0, 0], [1, 1, 0], [2, 1, 0]],  # zigzag
     ]
     pos = jnp.array(pos, dtype=jnp.float32)
-    labels = jnp.arange(8)
+    labels = jnp.arange(8, dtype=jnp.int32)
 
     graphs = []
 
     for p, l in zip(pos, labels):
-        senders, receivers = e3nn.radius_graph(p, 1.1)
+        # Sort the edges by receiver to allow a faster aggregation
+        senders, receivers = e3nn.radius_graph(p, 1.1, sort_by_dst=True)
 
         graphs += [
             jraph.GraphsTuple(
@@ -36,56 +38,88 @@ def tetris() -> jraph.GraphsTuple:
                 globals=l[None],  # [num_graphs]
                 senders=senders,  # [num_edges]
                 receivers=receivers,  # [num_edges]
-                n_node=jnp.array([len(p)]),  # [num_graphs]
-                n_edge=jnp.array([len(senders)]),  # [num_graphs]
+                n_node=jnp.array([len(p)], dtype=jnp.int32),  # [num_graphs]
+                n_edge=jnp.array([len(senders)], dtype=jnp.int32),  # [num_graphs]
             )
         ]
 
-    return jraph.batch(graphs)
+    graphs = jraph.batch(graphs)
+
+    # Keep the indices in int32 even if jax_enable_x64 is set
+    return graphs._replace(
+        senders=graphs.senders.astype(jnp.int32),
+        receivers=graphs.receivers.astype(jnp.int32),
+    )
+
+
+def _nearest_bigger_power_of_two(x: int) -> int:
+    y = 2
+    while y < x:
+        y *= 2
+    return y
+
+
+def pad_graphs(graphs: jraph.GraphsTuple) -> jraph.GraphsTuple:
+    """Pad the graphs to a fixed shape to avoid recompiling for every batch size.
+
+    The padding graph is the last one, use ``jraph.get_graph_padding_mask`` to ignore it.
+    """
+    n_node = _nearest_bigger_power_of_two(int(jnp.sum(graphs.n_node)) + 1)
+    n_edge = _nearest_bigger_power_of_two(int(jnp.sum(graphs.n_edge)))
+    n_graph = len(graphs.n_node) + 1
+    return jraph.pad_with_graphs(graphs, n_node, n_edge, n_graph)
 
 
 class Layer(flax.linen.Module):
     target_irreps: e3nn.Irreps
     denominator: float
-    sh_lmax: int = 3
 
     @flax.linen.compact
-    def __call__(self, graphs, positions):
+    def __call__(self, graphs, sh):
         target_irreps = e3nn.Irreps(self.target_irreps)
 
-        def update_edge_fn(edge_features, sender_features, receiver_features, globals):
-            sh = e3nn.spherical_harmonics(
-                list(range(1, self.sh_lmax + 1)),
-                positions[graphs.receivers] - positions[graphs.senders],
-                True,
-            )
-            return e3nn.concatenate(
-                [sender_features, e3nn.tensor_product(sender_features, sh)]
-            ).regroup()
-
-        def update_node_fn(node_features, sender_features, receiver_features, globals):
-            node_feats = receiver_features / self.denominator
-            node_feats = e3nn.flax.Linear(target_irreps, name="linear_pre")(node_feats)
-            node_feats = e3nn.scalar_activation(node_feats)
-            node_feats = e3nn.flax.Linear(target_irreps, name="linear_post")(node_feats)
-            shortcut = e3nn.flax.Linear(
-                node_feats.irreps, name="shortcut", force_irreps_out=True
-            )(node_features)
-            return shortcut + node_feats
-
-        return jraph.GraphNetwork(update_edge_fn, update_node_fn)(graphs)
+        # Edges
+        sender_features = graphs.nodes[graphs.senders]
+        edge_features = e3nn.concatenate(
+            [sender_features, e3nn.tensor_product(sender_features, sh)]
+        ).regroup()
+
+        # Nodes, the edges are sorted by receiver, see `tetris`
+        node_feats = e3nn.scatter_sum(
+            edge_features,
+            dst=graphs.receivers,
+            output_size=graphs.nodes.shape[0],
+            indices_are_sorted=True,
+        )
+        node_feats = node_feats / self.denominator
+        node_feats = e3nn.flax.Linear(target_irreps, name="linear_pre")(node_feats)
+        node_feats = e3nn.scalar_activation(node_feats)
+        node_feats = e3nn.flax.Linear(target_irreps, name="linear_post")(node_feats)
+        shortcut = e3nn.flax.Linear(
+            node_feats.irreps, name="shortcut", force_irreps_out=True
+        )(graphs.nodes)
+        return graphs._replace(nodes=shortcut + node_feats)
 
 
 class Model(flax.linen.Module):
+    sh_lmax: int = 3
+
     @flax.linen.compact
     def __call__(self, graphs):
         positions = e3nn.IrrepsArray("1o", graphs.nodes)
         graphs = graphs._replace(nodes=jnp.ones((len(positions), 1)))
 
+        # The edges are the same for all the layers
+        sh = e3nn.spherical_harmonics(
+            list(range(1, self.sh_lmax + 1)),
+            positions[graphs.receivers] - positions[graphs.senders],
+            True,
+        )
+
         layers = 2 * ["32x0e + 32x0o + 8x1e + 8x1o + 8x2e + 8x2o"] + ["0o + 7x0e"]
 
         for irreps in layers:
-            graphs = Layer(irreps, 1.5)(graphs, positions)
+            graphs = Layer(irreps, 1.5)(graphs, sh)
 
         # Readout logits
         pred = e3nn.scatter_sum(
@@ -108,23 +142,28 @@ def train(steps=200):
         logits = model.apply(params, graphs)
         labels = graphs.globals  # [num_graphs]
 
+        mask = jraph.get_graph_padding_mask(graphs)  # [num_graphs]
+
         loss = optax.softmax_cross_entropy_with_integer_labels(logits, labels)
-        loss = jnp.mean(loss)
+        loss = jnp.sum(jnp.where(mask, loss, 0.0)) / jnp.sum(mask)
         return loss, logits
 
-    @jax.jit
+    # The parameters and the optimizer state are updated in place
+    @partial(jax.jit, donate_argnums=(0, 1))
     def update_fn(params, opt_state, graphs):
         grad_fn = jax.grad(loss_fn, has_aux=True)
         grads, logits = grad_fn(params, graphs)
         labels = graphs.globals
-        accuracy = jnp.mean(jnp.argmax(logits, axis=1) == labels)
+        mask = jraph.get_graph_padding_mask(graphs)
+        correct = jnp.argmax(logits, axis=1) == labels
+        accuracy = jnp.sum(correct & mask) / jnp.sum(mask)
 
         updates, opt_state = opt.update(grads, opt_state)
         params = optax.apply_updates(params, updates)
         return params, opt_state, accuracy
 
     # Dataset
-    graphs = tetris()
+    graphs = pad_graphs(tetris())
 
     # Init
     init = jax.jit(model.init)
@@ -134,7 +173,7 @@ def train(steps=200):
     # compile jit
     wall = time.perf_counter()
     print("compiling...", flush=True)
-    _, _, accuracy = update_fn(params, opt_state, graphs)
+    params, opt_state, accuracy = update_fn(params, opt_state, graphs)
     print(f"initial accuracy = {100 * accuracy:.0f}%", flush=True)
     print(f"compilation took {time.perf_counter() - wall:.1f}s")
 
@@ -1,4 +1,5 @@
 import time
+from functools import partial
 
 import flax
 import jax
@@ -90,7 +91,8 @@ def train(steps=2000):
         loss = jnp.mean(loss)
         return loss, logits
 
-    @jax.jit
+    # The parameters and the optimizer state are updated in place
+    @partial(jax.jit, donate_argnums=(0, 1))
     def update_fn(params, opt_state, x, y):
         grad_fn = jax.grad(loss_fn, has_aux=True)
         grads, logits = grad_fn(params, x, y)
@@ -112,7 +114,7 @@ def train(steps=2000):
     # compile jit
     wall = time.perf_counter()
     print("compiling...", flush=True)
-    _, _, accuracy = update_fn(params, opt_state, x, y)
+    params, opt_state, accuracy = update_fn(params, opt_state, x, y)
     print(f"initial accuracy = {100 * accuracy:.0f}%", flush=True)
     print(f"compilation took {time.perf_counter() - wall:.1f}s")
 
@@ -22,3 +22,16 @@ def test_radius_graph():
     )
     assert src.shape == (12,)
     assert dst.shape == (12,)
+
+
+def test_radius_graph_sort_by_dst():
+    pos = jnp.array(
+        [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    )
+    src, dst = e3nn.radius_graph(pos, 1.01)
+    src_sorted, dst_sorted = e3nn.radius_graph(pos, 1.01, sort_by_dst=True)
+
+    assert jnp.all(jnp.diff(dst_sorted) >= 0)
+    assert set(zip(src.tolist(), dst.tolist())) == set(
+        zip(src_sorted.tolist(), dst_sorted.tolist())
+    )
@@ -43,6 +43,13 @@ def test_scatter_sum():
         jnp.array([[-9.0, -1.0], [0.0, 0.0], [5.0, 1.0]]),
     )
 
+    i = jnp.array([0, 0, 2, 2])
+    x = jnp.array([1.0, -10.0, 2.0, 3.0])
+    np.testing.assert_allclose(  # sorted dst
+        e3nn.scatter_sum(x, dst=i, output_size=3, indices_are_sorted=True),
+        jnp.array([-9.0, 0.0, 5.0]),
+    )
+
 
 def test_scatter_mean():
     x = jnp.array([[2.0, 3.0], [0.0, 3.0], [-10.0, 42.0]])
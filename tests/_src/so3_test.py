@@ -32,6 +32,11 @@ def test_clebsch_gordan_symmetry():
     )
 
 
+def test_clebsch_gordan_cached():
+    assert clebsch_gordan(1, 2, 3) is clebsch_gordan(1, 2, 3)
+    assert not clebsch_gordan(1, 2, 3).flags.writeable
+
+
 def unique_triplets(lmax):
     for l1 in range(lmax + 1):
         for l2 in range(l1 + 1):
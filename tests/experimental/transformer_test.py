@@ -2,14 +2,14 @@ import e3nn_jax as e3nn
 import haiku as hk
 import jax
 import jax.numpy as jnp
-from e3nn_jax.experimental.transformer import Transformer
+from e3nn_jax.experimental.transformer import Transformer, _sqrt_segment_softmax
 from e3nn_jax.utils import assert_equivariant
 
 
 def test_transformer(keys):
     @hk.without_apply_rng
     @hk.transform
-    def model(pos, src, dst, node_feat):
+    def model(pos, src, dst, node_feat, sorted_dst=False, logit_dtype=None):
         edge_distance = e3nn.norm(pos[dst] - pos[src]).array[..., 0]
         edge_weight_cutoff = e3nn.sus(3.0 * (2.0 - edge_distance))
         edge_attr = e3nn.concatenate(
@@ -30,7 +30,8 @@ def test_transformer(keys):
             list_neurons=[32, 32],
             act=jax.nn.relu,
             num_heads=2,
-        )(src, dst, edge_weight_cutoff, edge_attr, node_feat)
+            logit_dtype=logit_dtype,
+        )(src, dst, edge_weight_cutoff, edge_attr, node_feat, sorted_dst)
 
     apply = jax.jit(model.apply)
 
@@ -47,7 +48,15 @@ def test_transformer(keys):
     node_feat = e3nn.normal("2x0e + 2x1e + 2x2e", next(keys), (pos.shape[0],))
 
     w = model.init(next(keys), pos, src, dst, node_feat)
-    apply(w, pos, src, dst, node_feat)
+    out = apply(w, pos, src, dst, node_feat)
+
+    order = jnp.argsort(dst)
+    out_sorted = model.apply(w, pos, src[order], dst[order], node_feat, True)
+    assert jnp.allclose(out.array, out_sorted.array, atol=1e-5)
+
+    out_bf16 = model.apply(w, pos, src, dst, node_feat, logit_dtype=jnp.bfloat16)
+    assert out_bf16.dtype == out.dtype
+    assert jnp.allclose(out.array, out_bf16.array, atol=0.1)
 
     assert_equivariant(
         lambda pos, node_feat: apply(w, pos, src, dst, node_feat),
@@ -56,3 +65,62 @@ def test_transformer(keys):
         node_feat,
         atol=1e-4,
     )
+
+
+def test_transformer_zero_cutoff_gradient(keys):
+    @hk.without_apply_rng
+    @hk.transform
+    def model(pos, src, dst, node_feat):
+        edge_distance = e3nn.norm(pos[dst] - pos[src]).array[..., 0]
+        edge_weight_cutoff = e3nn.sus(3.0 * (2.0 - edge_distance))
+        edge_attr = e3nn.spherical_harmonics("0e + 1e + 2e", pos[dst] - pos[src], True)
+        return Transformer(
+            "0e + 2x1e + 2e", list_neurons=[32, 32], act=jax.nn.relu, num_heads=2
+        )(src, dst, edge_weight_cutoff, edge_attr, node_feat)
+
+    # Node 3 is only connected by an edge beyond the cutoff
+    pos = jnp.array(
+        [
+            [0.0, 0.0, 0.0],
+            [1.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0],
+            [5.0, 0.0, 0.0],
+        ]
+    )
+    src = jnp.array([0, 1, 0, 2, 1, 2, 0])
+    dst = jnp.array([1, 0, 2, 0, 2, 1, 3])
+    node_feat = e3nn.normal("2x0e + 2x1e + 2x2e", next(keys), (pos.shape[0],))
+
+    def loss(w, pos):
+        pos = e3nn.IrrepsArray("1e", pos)
+        return jnp.sum(model.apply(w, pos, src, dst, node_feat).array ** 2)
+
+    w = model.init(next(keys), e3nn.IrrepsArray("1e", pos), src, dst, node_feat)
+    grad_w, grad_pos = jax.grad(loss, argnums=(0, 1))(w, pos)
+    assert all(jnp.all(jnp.isfinite(g)) for g in jax.tree_util.tree_leaves(grad_w))
+    assert jnp.all(jnp.isfinite(grad_pos))
+
+
+def test_sqrt_segment_softmax_large_logits():
+    # The zero weight of segment 1 has a logit far above the others, segment 2 has only zero weights
+    segments = jnp.array([0, 0, 1, 1, 1, 2, 2])
+    weights = jnp.array([1.0, 1.0, 1.0, 1.0, 0.0, 0.0, 0.0])
+
+    for shift in [-1000.0, 0.0, 1000.0]:
+        logits = shift + jnp.array([[0.0], [1.0], [2.0], [0.0], [202.0], [1.0], [3.0]])
+        sqrt_alpha = _sqrt_segment_softmax(logits, weights, segments, 4)
+        assert jnp.all(jnp.isfinite(sqrt_alpha))
+        assert jnp.allclose(
+            e3nn.scatter_sum(sqrt_alpha**2, dst=segments, output_size=4)[:2], 1.0
+        )
+        assert sqrt_alpha[4, 0] == 0.0
+        assert jnp.all(sqrt_alpha[5:] == 0.0)
+
+        grad_logits, grad_weights = jax.grad(
+            lambda logits, weights: jnp.sum(
+                _sqrt_segment_softmax(logits, weights, segments, 4)
+            ),
+            argnums=(0, 1),
+        )(logits, weights)
+        assert jnp.all(jnp.isfinite(grad_logits))
+        assert jnp.all(jnp.isfinite(grad_weights))